@@ -0,0 +1,55 @@
+"""Benchmark page-text normalization against the original list comprehension.
+
+Run from the project directory: `python benchmarks/bench_normalize.py`
+"""
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from tools import _normalize_text
+
+WORDS = "the company reported revenue growth of percent in the quarter driven by".split()
+
+
+def baseline(text: str) -> str:
+    """Normalization used before the optimization (kept as the reference)."""
+    return '\n'.join([line.strip() for line in text.splitlines() if line.strip()])
+
+
+def make_page(rng: random.Random) -> str:
+    lines = []
+    for _ in range(50):
+        lines.append("  " + " ".join(rng.choice(WORDS) for _ in range(12)) + "   ")
+        if rng.random() < 0.2:
+            lines.append(rng.choice(["", "   ", "\f", " \t "]))
+    return "\n".join(lines)
+
+
+def timed(func, pages, repeat: int = 5) -> float:
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for page in pages:
+            func(page)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main() -> None:
+    rng = random.Random(0)
+    cases = {
+        "2000 prose pages": [make_page(rng) for _ in range(2000)],
+        "20k-space runs x 50": ['a' + ' ' * 20000 + 'b\n' + ' ' * 20000 for _ in range(50)],
+    }
+    for name, pages in cases.items():
+        assert all(_normalize_text(p) == baseline(p) for p in pages), name
+        old = timed(baseline, pages)
+        new = timed(_normalize_text, pages)
+        print(f"{name}: baseline {old:.4f}s, current {new:.4f}s ({old / new:.2f}x)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,31 @@
+"""Crew entry point shared by the API (main.py) and the background worker."""
+import threading
+
+from crewai import Crew, Process
+from agents import financial_analyst
+from task import analyze_financial_document as analyze_task
+
+# One crew per thread, built on first use and reused for later kickoffs.
+# kickoff mutates its agents and tasks (interpolated goal/description, task
+# output, executor state), so each thread's crew is a copy() with its own
+# agent and task objects rather than wrapping the shared module-level ones.
+_local = threading.local()
+
+
+def _get_crew() -> Crew:
+    crew = getattr(_local, 'crew', None)
+    if crew is None:
+        crew = Crew(
+            agents=[financial_analyst],
+            tasks=[analyze_task],
+            process=Process.sequential,
+        ).copy()
+        _local.crew = crew
+    return crew
+
+
+def run_crew(query: str, file_path: str="data/sample.pdf"):
+    """To run the whole crew"""
+    # Pass both query and file_path into the task context
+    result = _get_crew().kickoff({'query': query, 'file_path': file_path})
+    return result
@@ -1,12 +1,49 @@
-from sqlalchemy import create_engine, Column, String, Text, DateTime
+from sqlalchemy import create_engine, event, Column, String, Text, DateTime, Index
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy.orm import sessionmaker, scoped_session
+from sqlalchemy.pool import QueuePool
 import datetime
+import gzip
+import os
 import uuid
 
+# zstandard is optional; gzip (stdlib) is used for spilled results without it
+try:
+    import zstandard
+except Exception:
+    zstandard = None
+
 # SQLite database stored in workspace
-engine = create_engine('sqlite:///analysis.db', echo=False, future=True)
+engine = create_engine(
+    'sqlite:///analysis.db',
+    echo=False,
+    future=True,
+    connect_args={'check_same_thread': False},
+    pool_pre_ping=True,
+    # Keep warm connections (PRAGMAs applied once each). pool_size matches
+    # Dramatiq's default of 8 worker threads per process; overflow connections
+    # still absorb bursts rather than failing with a pool timeout.
+    poolclass=QueuePool,
+    pool_size=8,
+    max_overflow=10,
+)
+
+
+@event.listens_for(engine, "connect")
+def _set_sqlite_pragmas(dbapi_connection, connection_record):
+    """Tune each new SQLite connection for concurrent API/worker access."""
+    cursor = dbapi_connection.cursor()
+    cursor.execute("PRAGMA journal_mode=WAL")
+    cursor.execute("PRAGMA synchronous=NORMAL")
+    cursor.execute("PRAGMA busy_timeout=5000")
+    cursor.execute("PRAGMA temp_store=MEMORY")
+    cursor.execute("PRAGMA cache_size=-20000")
+    cursor.close()
+
+
 SessionLocal = sessionmaker(bind=engine)
+# Thread-local session reused across calls; `with ScopedSession() as s` closes it
+ScopedSession = scoped_session(SessionLocal)
 Base = declarative_base()
 
 class Analysis(Base):
@@ -19,7 +56,73 @@ class Analysis(Base):
     created_at = Column(DateTime, default=datetime.datetime.utcnow)
     updated_at = Column(DateTime, default=datetime.datetime.utcnow, onupdate=datetime.datetime.utcnow)
 
+    __table_args__ = (
+        # job listings filter by status and order by age
+        Index('ix_analysis_status_created', 'status', 'created_at'),
+    )
+
 
 def init_db():
-    """Create tables if they don't exist."""
+    """Create tables and indexes if they don't exist."""
     Base.metadata.create_all(bind=engine)
+    # create_all skips indexes of tables that already exist; add any missing ones
+    for index in Analysis.__table__.indexes:
+        index.create(bind=engine, checkfirst=True)
+
+
+# Results above this size are spilled to a compressed file so analysis rows
+# (and /status responses that don't need the body) stay small.
+RESULT_INLINE_LIMIT = 64 * 1024
+RESULTS_DIR = os.path.join('data', 'results')
+
+# A spilled row stores only a marker naming the codec; the file is always
+# RESULTS_DIR/<job id>.<codec>, so stored values never carry a path. Inline
+# results starting with '@' are escaped with a second '@' so result text
+# (LLM output) can never be mistaken for a marker.
+RESULT_FILE_PREFIX = '@file:'
+_RESULT_CODECS = ('zst', 'gz')
+
+
+def _result_path(job_id: str, codec: str) -> str:
+    return os.path.join(RESULTS_DIR, f"{uuid.UUID(job_id)}.{codec}")
+
+
+def store_result(job: Analysis, text: str) -> None:
+    """Set `job.result`, spilling large results to `RESULTS_DIR`."""
+    data = text.encode('utf-8')
+    if len(data) <= RESULT_INLINE_LIMIT:
+        job.result = f"@{text}" if text.startswith('@') else text
+        return
+    os.makedirs(RESULTS_DIR, exist_ok=True)
+    if zstandard is not None:
+        codec = 'zst'
+        data = zstandard.ZstdCompressor(level=3).compress(data)
+    else:
+        codec = 'gz'
+        data = gzip.compress(data, compresslevel=6)
+    with open(_result_path(job.id, codec), 'wb') as f:
+        f.write(data)
+    job.result = f"{RESULT_FILE_PREFIX}{codec}"
+
+
+def load_result(job_id: str, value):
+    """Return the full result text for job `job_id`'s stored `Analysis.result`.
+
+    Blocking file IO for spilled results; raises OSError if the file is gone.
+    """
+    if not value or not value.startswith('@'):
+        return value
+    if value.startswith('@@'):
+        return value[1:]
+    codec = value[len(RESULT_FILE_PREFIX):]
+    if not value.startswith(RESULT_FILE_PREFIX) or codec not in _RESULT_CODECS:
+        return value
+    with open(_result_path(job_id, codec), 'rb') as f:
+        data = f.read()
+    if codec == 'zst':
+        if zstandard is None:
+            raise OSError("zstandard is required to read this result")
+        data = zstandard.ZstdDecompressor().decompress(data)
+    else:
+        data = gzip.decompress(data)
+    return data.decode('utf-8')
@@ -1,6 +1,7 @@
 import os
 import uuid
 import asyncio
+from contextlib import asynccontextmanager
 
 try:
     from fastapi import FastAPI, File, UploadFile, Form, HTTPException
@@ -8,44 +9,51 @@ try:
 except Exception:
     FASTAPI_AVAILABLE = False
 
-from crewai import Crew, Process
-from agents import financial_analyst
-from task import analyze_financial_document as analyze_task
+from crew_runner import run_crew
+from tools import MAX_PDF_BYTES
 
 # database and queue imports
-from db import SessionLocal, Analysis, init_db
+from db import ScopedSession, Analysis, init_db, store_result, load_result
 
-# Try to import Redis and RQ, but make them optional
+# Background queue backend, chosen explicitly so installing an extra package
+# never reroutes jobs: QUEUE_BACKEND=rq (default; `rq worker financial`),
+# dramatiq (persistent `dramatiq worker -Q financial` processes) or sync.
+QUEUE_BACKEND = (os.getenv('QUEUE_BACKEND') or 'rq').strip().lower()
 REDIS_AVAILABLE = False
+redis_conn = None
+queue = None
 try:
-    from redis import Redis
-    from rq import Queue
-    redis_conn = Redis()
-    queue = Queue('financial', connection=redis_conn)
-    REDIS_AVAILABLE = True
+    if QUEUE_BACKEND == 'dramatiq':
+        # Same imports worker.py needs to declare process_job_actor
+        import dramatiq  # noqa: F401
+        from dramatiq.brokers.redis import RedisBroker  # noqa: F401
+        REDIS_AVAILABLE = True
+    elif QUEUE_BACKEND == 'rq':
+        from redis import Redis
+        from rq import Queue
+        redis_conn = Redis()
+        # Jobs may wait on the LLM for minutes; results live in SQLite, so RQ
+        # keeps no return values and drops failed-job records after a day.
+        queue = Queue('financial', connection=redis_conn, default_timeout=600)
+        REDIS_AVAILABLE = True
+    elif QUEUE_BACKEND != 'sync':
+        raise ValueError(f"unknown QUEUE_BACKEND {QUEUE_BACKEND!r} (expected rq, dramatiq or sync)")
 except Exception as e:
-    print(f"Warning: Redis/RQ not available: {e}")
+    print(f"Warning: {QUEUE_BACKEND} queue not available: {e}")
     print("Running in synchronous mode without background tasks")
-    redis_conn = None
-    queue = None
 
 
+# Uploads are copied to disk in 1 MiB chunks to keep memory bounded
+UPLOAD_CHUNK_SIZE = 1 << 20
+
 if FASTAPI_AVAILABLE:
-    app = FastAPI(title="Financial Document Analyzer")
-
-# ensure database tables exist
-init_db()
-def run_crew(query: str, file_path: str="data/sample.pdf"):
-    """To run the whole crew"""
-    financial_crew = Crew(
-        agents=[financial_analyst],
-        tasks=[analyze_task],
-        process=Process.sequential,
-    )
-    
-    # Pass both query and file_path into the task context
-    result = financial_crew.kickoff({'query': query, 'file_path': file_path})
-    return result
+    @asynccontextmanager
+    async def lifespan(app):
+        # ensure database tables exist (once per server process, not per import)
+        init_db()
+        yield
+
+    app = FastAPI(title="Financial Document Analyzer", lifespan=lifespan)
 
 if FASTAPI_AVAILABLE:
     @app.get("/")
@@ -56,12 +64,17 @@ if FASTAPI_AVAILABLE:
     @app.get("/status/{job_id}")
     async def job_status(job_id: str):
         """Return status and result of a queued analysis"""
-        session = SessionLocal()
-        record = session.get(Analysis, job_id)
-        session.close()
-        if not record:
-            raise HTTPException(status_code=404, detail="Job not found")
-        return {"job_id": record.id, "status": record.status, "result": record.result}
+        with ScopedSession() as session:
+            record = session.get(Analysis, job_id)
+            if not record:
+                raise HTTPException(status_code=404, detail="Job not found")
+            record_id, status, stored = record.id, record.status, record.result
+        try:
+            # spilled results are read and decompressed from disk; keep it off the event loop
+            result = await asyncio.to_thread(load_result, record_id, stored)
+        except OSError:
+            raise HTTPException(status_code=500, detail="Stored result is missing or unreadable")
+        return {"job_id": record_id, "status": status, "result": result}
 
     @app.post("/analyze")
     async def analyze_financial_document(
@@ -76,30 +89,59 @@ if FASTAPI_AVAILABLE:
         try:
             # Ensure data directory exists
             os.makedirs("data", exist_ok=True)
-            
-            # Save uploaded file
-            with open(file_path, "wb") as f:
-                content = await file.read()
-                f.write(content)
+
+            # Save uploaded file in bounded chunks instead of buffering it whole.
+            # The crew's tool reads documents by path, so both modes need it on disk.
+            size = 0
+            with open(file_path, "wb", buffering=UPLOAD_CHUNK_SIZE) as f:
+                while chunk := await file.read(UPLOAD_CHUNK_SIZE):
+                    size += len(chunk)
+                    if size > MAX_PDF_BYTES:
+                        break
+                    f.write(chunk)
+            if size > MAX_PDF_BYTES:
+                os.remove(file_path)
             
             # Validate query
             if query=="" or query is None:
                 query = "Analyze this financial document for investment insights"
+
+            # Oversized uploads are recorded as failed instead of tying up a worker;
+            # the partial file is already deleted, so no path is stored
+            if size > MAX_PDF_BYTES:
+                error = f"error: file exceeds the {MAX_PDF_BYTES // (1024 * 1024)} MB limit"
+                with ScopedSession() as session, session.begin():
+                    job = Analysis(query=query.strip(), file_path=None, status="failed", result=error)
+                    session.add(job)
+                    session.flush()
+                    job_id = job.id
+                return {
+                    "status": "failed",
+                    "job_id": job_id,
+                    "query": query,
+                    "file_processed": file.filename,
+                    "result": error
+                }
                 
             # record job in database
-            session = SessionLocal()
-            job = Analysis(query=query.strip(), file_path=file_path, status="pending")
-            session.add(job)
-            session.commit()
-            session.refresh(job)
-            job_id = job.id
-            session.close()
+            with ScopedSession() as session, session.begin():
+                job = Analysis(query=query.strip(), file_path=file_path, status="pending")
+                session.add(job)
+                session.flush()
+                job_id = job.id
 
             # Choose between background processing (Redis) or synchronous processing
             if REDIS_AVAILABLE:
                 # enqueue the processing task
-                from worker import process_job
-                queue.enqueue(process_job, job_id, query.strip(), file_path)
+                if QUEUE_BACKEND == 'dramatiq':
+                    from worker import process_job_actor
+                    process_job_actor.send(job_id, query.strip(), file_path)
+                else:
+                    from worker import process_job
+                    queue.enqueue(
+                        process_job, job_id, query.strip(), file_path,
+                        result_ttl=0, failure_ttl=86400,
+                    )
                 return {
                     "status": "queued",
                     "job_id": job_id,
@@ -109,13 +151,12 @@ if FASTAPI_AVAILABLE:
             else:
                 # Process synchronously without Redis
                 try:
-                    result = run_crew(query=query.strip(), file_path=file_path)
-                    session = SessionLocal()
-                    job = session.get(Analysis, job_id)
-                    job.result = str(result)
-                    job.status = 'completed'
-                    session.commit()
-                    session.close()
+                    # run_crew parses the PDF synchronously; keep it off the event loop
+                    result = await asyncio.to_thread(run_crew, query=query.strip(), file_path=file_path)
+                    with ScopedSession() as session, session.begin():
+                        job = session.get(Analysis, job_id)
+                        store_result(job, str(result))
+                        job.status = 'completed'
                     return {
                         "status": "completed",
                         "job_id": job_id,
@@ -124,18 +165,22 @@ if FASTAPI_AVAILABLE:
                         "result": str(result)
                     }
                 except Exception as e:
-                    session = SessionLocal()
-                    job = session.get(Analysis, job_id)
-                    job.result = f"error: {e}"
-                    job.status = 'failed'
-                    session.commit()
-                    session.close()
+                    with ScopedSession() as session, session.begin():
+                        job = session.get(Analysis, job_id)
+                        job.result = f"error: {e}"
+                        job.status = 'failed'
                     raise HTTPException(status_code=500, detail=f"Error processing document: {str(e)}")
+                finally:
+                    # The upload was written only for this request; reclaim the space
+                    try:
+                        os.remove(file_path)
+                    except OSError:
+                        pass
             
         except Exception as e:
             raise HTTPException(status_code=500, detail=f"Error queuing financial document: {str(e)}")
         
-        # note: do not remove file here; worker may need it later or implement cleanup separately
+        # note: queued uploads are not removed here; the worker deletes them once the job has run
 
 
 if __name__ == "__main__":
@@ -1,5 +1,12 @@
 ## Importing libraries and files
+import io
+import mmap
 import os
+import hashlib
+import tempfile
+import threading
+from collections import OrderedDict
+from functools import lru_cache
 try:
     from dotenv import load_dotenv
     load_dotenv()
@@ -9,48 +16,214 @@ except Exception:
 from crewai_tools import tools
 from crewai_tools import SerperDevTool
 
+# Prefer pypdf (the maintained PyPDF2 fork, faster cmap handling); keep PyPDF2
+# as a fallback for environments that still pin it.
 try:
-    from PyPDF2 import PdfReader
+    from pypdf import PdfReader
 except Exception:
-    PdfReader = None
+    try:
+        from PyPDF2 import PdfReader
+    except Exception:
+        PdfReader = None
+
+# Optional: NumPy speeds up word counting on large ASCII documents
+try:
+    import numpy as np
+except Exception:
+    np = None
+
+# Optional secondary extractor, only used when the fast path yields no text
+try:
+    from pdfminer.high_level import extract_text as pdfminer_extract_text
+except Exception:
+    pdfminer_extract_text = None
 
 ## Creating search tool (stub)
 search_tool = SerperDevTool()
 
+# Extracted text is cached on disk keyed by the SHA-256 of the PDF bytes, so
+# re-uploads of the same document skip parsing regardless of their file name.
+# Bump CACHE_VERSION whenever extraction output changes to drop stale entries.
+CACHE_DIR = os.path.join('data', '.cache')
+CACHE_VERSION = '3'
+
+# Uploads larger than this are rejected before any parsing work is done
+MAX_PDF_BYTES = 50 * 1024 * 1024
+
+# perf: constants and lookup tables used on hot paths are built once here at
+# import time. Prefer C-level str methods (splitlines/strip/split) over regexes
+# for per-page text work; a pattern that starts with an unanchored `\s*` retries
+# at every space and goes quadratic on long whitespace runs. Any hot-path regex
+# added here must be compiled once, must not backtrack over whitespace, and needs
+# a benchmark against the plain-str version (see benchmarks/).
+
+# PDF header marker; the spec allows it anywhere in the first 1024 bytes
+_PDF_MAGIC = b'%PDF'
+_PDF_HEADER_WINDOW = 1024
+
+# ASCII characters str.split() treats as whitespace: \t\n\v\f\r, \x1c-\x1f and space
+if np is not None:
+    _ASCII_WS = np.zeros(256, dtype=bool)
+    _ASCII_WS[[9, 10, 11, 12, 13, 28, 29, 30, 31, 32]] = True
+
+
+def _ensure_cache_dir() -> None:
+    """Create the cache directory and clear it if the version tag changed."""
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    version_path = os.path.join(CACHE_DIR, 'VERSION')
+    try:
+        with open(version_path, 'r', encoding='utf-8') as f:
+            if f.read().strip() == CACHE_VERSION:
+                return
+    except OSError:
+        pass
+    for name in os.listdir(CACHE_DIR):
+        if name.endswith('.txt'):
+            os.remove(os.path.join(CACHE_DIR, name))
+    _load_cached_text.cache_clear()
+    with open(version_path, 'w', encoding='utf-8') as f:
+        f.write(CACHE_VERSION)
+
+
+@lru_cache(maxsize=64)
+def _load_cached_text(digest: str) -> str:
+    """Return cached text for `digest`; raises OSError on a cache miss."""
+    with open(os.path.join(CACHE_DIR, f"{digest}.txt"), 'r', encoding='utf-8') as f:
+        return f.read()
+
+
+def _store_cached_text(digest: str, text: str) -> None:
+    """Write `text` to the cache atomically so readers never see partial files."""
+    try:
+        _ensure_cache_dir()
+        target = os.path.join(CACHE_DIR, f"{digest}.txt")
+        # mkstemp gives each writer (process or thread) its own temp file
+        fd, tmp = tempfile.mkstemp(dir=CACHE_DIR, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                f.write(text)
+            os.replace(tmp, target)
+        except OSError:
+            os.remove(tmp)
+            raise
+    except OSError:
+        pass
+
+
+def _normalize_text(text: str) -> str:
+    """Strip every line and drop blank ones.
+
+    Same output as the original per-line list comprehension, but splitlines,
+    strip, filter and join all run in C with no Python bytecode per line
+    (benchmarks/bench_normalize.py).
+    """
+    return '\n'.join(filter(None, map(str.strip, text.splitlines())))
+
+
+def _normalize_page(page) -> str:
+    return _normalize_text(page.extract_text() or "")
+
+
+def _read_document(data, open_stream) -> str:
+    """Extract text from the document bytes `data` (bytes or a read-only mmap).
+
+    `open_stream` returns a fresh seekable stream over the same document.
+    """
+    # Non-PDF uploads go straight to the text fallback
+    if PdfReader is not None and _PDF_MAGIC in data[:_PDF_HEADER_WINDOW]:
+        digest = hashlib.sha256(data).hexdigest()
+        try:
+            _ensure_cache_dir()
+            return _load_cached_text(digest)
+        except OSError:
+            pass
+
+        try:
+            with open_stream() as stream:
+                reader = PdfReader(stream)
+                full_report = [_normalize_page(page) for page in reader.pages]
+            full_text = "\n\n".join(full_report)
+            if not full_text.strip() and pdfminer_extract_text is not None:
+                with open_stream() as stream:
+                    full_text = _normalize_text(pdfminer_extract_text(stream) or "")
+            # Empty output may come from a transient failure or a missing
+            # optional extractor; don't pin it in the cache
+            if full_text.strip():
+                _store_cached_text(digest, full_text)
+            return full_text
+        except Exception:
+            pass
+
+    # Fallback: try to read as text
+    try:
+        return bytes(data).decode('utf-8', errors='ignore')
+    except Exception:
+        return ''
+
 
 class FinancialDocumentTool:
     @staticmethod
-    async def read_data_tool(path: str = 'data/sample.pdf') -> str:
+    def read_data_tool(path: str = 'data/sample.pdf') -> str:
         """Read text content from a PDF file at `path`.
 
         Falls back to returning raw bytes->utf-8 decoded text if PDF parsing is unavailable.
+        This is blocking CPU/IO work; from async code call it via `asyncio.to_thread`.
         """
-        if not os.path.exists(path):
+        # Cheap pre-screen: skip empty or oversized files without reading them
+        try:
+            size = os.path.getsize(path)
+        except OSError:
+            return ""
+        if size == 0 or size > MAX_PDF_BYTES:
             return ""
 
-        if PdfReader is not None:
-            try:
-                reader = PdfReader(path)
-                full_report = []
-                for page in reader.pages:
-                    text = page.extract_text() or ""
-                    # Normalize whitespace
-                    text = '\n'.join([line.strip() for line in text.splitlines() if line.strip()])
-                    full_report.append(text)
-                return "\n\n".join(full_report)
-            except Exception:
-                pass
-
-        # Fallback: try to read as text
         try:
-            with open(path, 'rb') as f:
-                data = f.read()
-            try:
-                return data.decode('utf-8', errors='ignore')
-            except Exception:
-                return ''
+            f = open(path, 'rb')
         except Exception:
             return ''
+        with f:
+            # Map the file read-only so pypdf only pages in the regions it seeks
+            # to; hashing, parsing and the text fallback all share the mapping.
+            try:
+                data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            except (OSError, ValueError, AttributeError):
+                data = f.read()
+                return _read_document(data, lambda: io.BytesIO(data))
+            with data:
+                return _read_document(data, lambda: mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ))
+
+
+# Document statistics are pure functions of the text, so they are memoized by a
+# short digest (not the text itself, to avoid pinning large documents in memory)
+_STATS_CACHE_SIZE = 1024
+_stats_cache = OrderedDict()
+_stats_lock = threading.Lock()
+
+
+def _count_words(data: str) -> int:
+    """Count whitespace-separated words, same result as `len(data.split())`."""
+    if np is None or not data or not data.isascii():
+        return len(data.split())
+    is_ws = _ASCII_WS[np.frombuffer(data.encode('ascii'), dtype=np.uint8)]
+    # A word starts at every non-whitespace byte preceded by whitespace (or at 0)
+    starts = np.count_nonzero(is_ws[:-1] & ~is_ws[1:])
+    return int(starts) + (0 if is_ws[0] else 1)
+
+
+def _document_stats(data: str) -> tuple:
+    """Return (num_words, num_chars) for `data`, reusing earlier results."""
+    key = hashlib.blake2b(data.encode('utf-8', 'surrogatepass'), digest_size=16).digest()
+    with _stats_lock:
+        stats = _stats_cache.get(key)
+        if stats is not None:
+            _stats_cache.move_to_end(key)
+            return stats
+    stats = (_count_words(data), len(data))
+    with _stats_lock:
+        _stats_cache[key] = stats
+        if len(_stats_cache) > _STATS_CACHE_SIZE:
+            _stats_cache.popitem(last=False)
+    return stats
 
 
 class InvestmentTool:
@@ -60,9 +233,7 @@ class InvestmentTool:
         if not financial_document_data:
             return "No document content available for investment analysis."
 
-        words = financial_document_data.split()
-        num_words = len(words)
-        num_chars = len(financial_document_data)
+        num_words, num_chars = _document_stats(financial_document_data)
         return f"Document size: {num_words} words, {num_chars} characters. Detailed analysis not implemented."
 
 
@@ -1,33 +1,79 @@
-"""Background worker for processing queued jobs using RQ."""
-from redis import Redis
-from rq import Queue
-from main import run_crew
-from db import SessionLocal, Analysis
+"""Background worker for processing queued jobs using Dramatiq or RQ."""
+import os
 
-# Redis connection (default localhost:6379)
-redis_conn = Redis()
-queue = Queue('financial', connection=redis_conn)
+from crew_runner import run_crew
+from db import ScopedSession, Analysis, init_db, store_result
+
+# ensure database tables exist once at worker boot
+init_db()
+
+# Dramatiq broker (default localhost:6379); must be set before actors are declared
+try:
+    import dramatiq
+    from dramatiq.brokers.redis import RedisBroker
+    dramatiq.set_broker(RedisBroker())
+except Exception:
+    dramatiq = None
+
+
+def _finish_job(job_id: str, result, error) -> None:
+    """Record the job outcome; if storing a result fails, mark the job failed."""
+    try:
+        with ScopedSession() as session, session.begin():
+            record = session.get(Analysis, job_id)
+            if error is None:
+                store_result(record, str(result))
+                record.status = 'completed'
+            else:
+                record.result = f'error: {error}'
+                record.status = 'failed'
+    except Exception as e:
+        if error is not None:
+            raise
+        with ScopedSession() as session, session.begin():
+            record = session.get(Analysis, job_id)
+            record.result = f'error: could not store result: {e}'
+            record.status = 'failed'
 
 
 def process_job(job_id: str, query: str, file_path: str) -> None:
     """Function executed by worker to run analysis and update database."""
-    session = SessionLocal()
-    record = session.get(Analysis, job_id)
-    if not record:
-        session.close()
-        return
+    with ScopedSession() as session:
+        if session.get(Analysis, job_id) is None:
+            return
+
+    # No session is held while the crew runs; LLM calls can take minutes.
+    # The row is finalized in `finally` so it never stays pending, including
+    # when the run is interrupted by a BaseException such as Dramatiq's
+    # TimeLimitExceeded, which `except Exception` does not catch.
+    result, error = None, 'interrupted before completion'
     try:
         result = run_crew(query=query, file_path=file_path)
-        record.result = str(result)
-        record.status = 'completed'
+        error = None
     except Exception as e:
-        record.result = f'error: {e}'
-        record.status = 'failed'
+        error = e
     finally:
-        session.commit()
-        session.close()
+        try:
+            _finish_job(job_id, result, error)
+        finally:
+            # The upload was written only for this job; reclaim the space
+            try:
+                os.remove(file_path)
+            except OSError:
+                pass
+
+
+if dramatiq is not None:
+    # Started via `dramatiq worker -Q financial`; worker processes stay alive
+    # between jobs, so crew, PDF and DB imports are paid once at boot.
+    # time_limit matches the RQ default_timeout (600 s) set in main.py, and
+    # max_retries=0 keeps RQ's one-crew-run-per-job behaviour: a failed or
+    # timed-out job is recorded as failed rather than re-running the crew.
+    process_job_actor = dramatiq.actor(
+        process_job, queue_name='financial', time_limit=600_000, max_retries=0,
+    )
 
 
 if __name__ == '__main__':
-    # This file can be started as an RQ worker via `rq worker financial`
-    print("run 'rq worker financial' to start processing jobs")
+    # This file can be started as a Dramatiq worker or as an RQ worker
+    print("run 'dramatiq worker -Q financial' (or 'rq worker financial') to start processing jobs")